@@ -6,12 +6,33 @@ and alerts only when NEW good days appear on the horizon.
 """
 
 import os
+import cProfile
+import functools
+import glob
+import gzip
+import hashlib
+import hmac
 import json
+import math
+import pstats
+import sys
+import threading
 import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from contextlib import contextmanager
+from typing import Optional
 from zoneinfo import ZoneInfo
 
 import requests
+from requests.adapters import HTTPAdapter
+
+# All HTTP goes through this session; --profile can mount a ResponseRecorder on it
+http_session = requests.Session()
 
 # =============================================================================
 # CONFIGURATION
@@ -28,133 +49,206 @@ BASE_URL = "https://api.willyweather.com.au/v2"
 
 FORECAST_DAYS = 5
 
+# WillyWeather daily quota in billed units (0 = unlimited); usage per day is kept in
+# the Supabase willyweather_quota table (supabase/willyweather_quota.sql), shared by
+# the worker and --serve
+WILLYWEATHER_DAILY_QUOTA = int(os.environ.get("WILLYWEATHER_DAILY_QUOTA", "0"))
+QUOTA_TIMEZONE = "Australia/Sydney"
+
+# What the planner requests per beach; plain tide events are only a fallback
+FETCH_FORECASTS = "swell,wind"
+FETCH_FORECAST_GRAPHS = "tides"
+
+# Quality thresholds applied to every user (tunable via --replay)
+MIN_SWELL_PERIOD = 7  # seconds
+WIND_TOLERANCE = 0.2  # fraction over the user's max wind still accepted
+
+# Columnar forecast archive, partitioned as <dir>/<beach_id>/<YYYY-MM-DD>.json.gz
+FORECAST_ARCHIVE_DIR = os.environ.get("FORECAST_ARCHIVE_DIR", "forecast_archive")
+
+# On-demand evaluation service (--serve)
+SERVICE_HOST = os.environ.get("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.environ.get("PORT", "8080"))
+SERVICE_TOKEN = os.environ.get("SERVICE_TOKEN", "")
+# Seconds before a cached forecast is refetched in the background. WillyWeather
+# forecasts only change a few times a day; every refresh costs the same quota
+# units per cached beach as the daily run, so 6h means ~4x the daily run's usage.
+FORECAST_CACHE_TTL = int(os.environ.get("SERVICE_FORECAST_TTL", str(6 * 60 * 60)))
+FORECAST_REFRESH_INTERVAL = 60  # seconds between background refresh passes
+
+# Nearby breaks suggested when a user's home beach has no good days
+ALTERNATIVE_RADIUS_KM = 50
+ALTERNATIVE_MAX_BEACHES = 3
+
 # =============================================================================
-# BEACH DATA - Wind direction ranges (matches webapp/src/data/beaches.ts)
+# BEACH DATA - Wind direction ranges (match webapp/src/data/beaches.ts) and coordinates
 # =============================================================================
 
 BEACHES = {
     18159: {
         "name": "Noosa Main Beach",
+        "lat": -26.3855,
+        "lon": 153.0907,
         "offshoreRange": (135, 225),
         "crossShoreRange": [(90, 135), (225, 270)],
         "onshoreRange": (270, 90),
     },
     18156: {
         "name": "Maroochydore Beach",
+        "lat": -26.653,
+        "lon": 153.101,
         "offshoreRange": (225, 315),
         "crossShoreRange": [(180, 225), (315, 360)],
         "onshoreRange": (0, 180),
     },
     5956: {
         "name": "Burleigh Heads",
+        "lat": -28.088,
+        "lon": 153.454,
         "offshoreRange": (180, 270),
         "crossShoreRange": [(135, 180), (270, 315)],
         "onshoreRange": (315, 135),
     },
     5972: {
         "name": "Currumbin",
+        "lat": -28.133,
+        "lon": 153.488,
         "offshoreRange": (155, 245),
         "crossShoreRange": [(110, 155), (245, 290)],
         "onshoreRange": (290, 110),
     },
     18118: {
         "name": "Coolangatta Beach",
+        "lat": -28.166,
+        "lon": 153.537,
         "offshoreRange": (135, 225),
         "crossShoreRange": [(90, 135), (225, 270)],
         "onshoreRange": (270, 90),
     },
     19017: {
         "name": "Byron Bay Beach",
+        "lat": -28.642,
+        "lon": 153.612,
         "offshoreRange": (135, 225),
         "crossShoreRange": [(90, 135), (225, 270)],
         "onshoreRange": (270, 90),
     },
     3736: {
         "name": "Coffs Harbour",
+        "lat": -30.2986,
+        "lon": 153.1394,
         "offshoreRange": (225, 315),
         "crossShoreRange": [(180, 225), (315, 360)],
         "onshoreRange": (0, 180),
     },
     17641: {
         "name": "Newcastle Beach",
+        "lat": -32.929,
+        "lon": 151.789,
         "offshoreRange": (225, 315),
         "crossShoreRange": [(180, 225), (315, 360)],
         "onshoreRange": (0, 180),
     },
     17814: {
         "name": "Manly Beach",
+        "lat": -33.797,
+        "lon": 151.288,
         "offshoreRange": (225, 315),
         "crossShoreRange": [(180, 225), (315, 360)],
         "onshoreRange": (0, 180),
     },
     4988: {
         "name": "Bondi Beach",
+        "lat": -33.891,
+        "lon": 151.277,
         "offshoreRange": (225, 315),
         "crossShoreRange": [(180, 225), (315, 360)],
         "onshoreRange": (0, 180),
     },
     3168: {
         "name": "Cronulla",
+        "lat": -34.056,
+        "lon": 151.154,
         "offshoreRange": (245, 335),
         "crossShoreRange": [(200, 245), (335, 20)],
         "onshoreRange": (20, 200),
     },
     13364: {
         "name": "Torquay Surf Beach",
+        "lat": -38.342,
+        "lon": 144.323,
         "offshoreRange": (315, 45),
         "crossShoreRange": [(270, 315), (45, 90)],
         "onshoreRange": (90, 270),
     },
     11642: {
         "name": "Bells Beach",
+        "lat": -38.371,
+        "lon": 144.283,
         "offshoreRange": (270, 360),
         "crossShoreRange": [(225, 270), (0, 45)],
         "onshoreRange": (45, 225),
     },
     19298: {
         "name": "13th Beach",
+        "lat": -38.285,
+        "lon": 144.472,
         "offshoreRange": (315, 45),
         "crossShoreRange": [(270, 315), (45, 90)],
         "onshoreRange": (90, 270),
     },
     13591: {
         "name": "Cape Woolamai",
+        "lat": -38.557,
+        "lon": 145.344,
         "offshoreRange": (335, 65),
         "crossShoreRange": [(290, 335), (65, 110)],
         "onshoreRange": (110, 290),
     },
     13866: {
         "name": "Portsea Back Beach",
+        "lat": -38.344,
+        "lon": 144.704,
         "offshoreRange": (335, 65),
         "crossShoreRange": [(290, 335), (65, 110)],
         "onshoreRange": (110, 290),
     },
     19555: {
         "name": "Scarborough Beach",
+        "lat": -31.894,
+        "lon": 115.755,
         "offshoreRange": (45, 135),
         "crossShoreRange": [(0, 45), (135, 180)],
         "onshoreRange": (180, 0),
     },
     18919: {
         "name": "Trigg Beach",
+        "lat": -31.87,
+        "lon": 115.751,
         "offshoreRange": (45, 135),
         "crossShoreRange": [(0, 45), (135, 180)],
         "onshoreRange": (180, 0),
     },
     15258: {
         "name": "Margaret River",
+        "lat": -33.955,
+        "lon": 114.992,
         "offshoreRange": (65, 155),
         "crossShoreRange": [(20, 65), (155, 200)],
         "onshoreRange": (200, 20),
     },
     19399: {
         "name": "South Port",
+        "lat": -35.16,
+        "lon": 138.467,
         "offshoreRange": (25, 115),
         "crossShoreRange": [(340, 25), (115, 160)],
         "onshoreRange": (160, 340),
     },
     10135: {
         "name": "Middleton",
+        "lat": -35.51,
+        "lon": 138.705,
         "offshoreRange": (315, 45),
         "crossShoreRange": [(270, 315), (45, 90)],
         "onshoreRange": (90, 270),
@@ -186,11 +280,339 @@ BEACH_STATES = {
 }
 
 
+# =============================================================================
+# CACHES - bounded memoization for timezone, timestamp and date-label hot spots
+# =============================================================================
+
+TZ_CACHE_SIZE = 64
+TIMESTAMP_CACHE_SIZE = 8192  # ~200 timestamps per beach forecast
+DATE_LABEL_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=TZ_CACHE_SIZE)
 def get_beach_tz(beach_id: int) -> ZoneInfo:
     state = BEACH_STATES.get(beach_id, "QLD")
     return ZoneInfo(BEACH_TIMEZONES[state])
 
 
+@functools.lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parse_forecast_time(dt_str: str, tz: ZoneInfo) -> Optional[tuple]:
+    """
+    Parse a forecast "YYYY-MM-DD HH:MM:SS" local time into
+    (epoch, hour, "YYYY-MM-DD", "HH:MM"), or None if it's malformed.
+    """
+    try:
+        dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=tz)
+    except (ValueError, TypeError):
+        return None
+    return dt.timestamp(), dt.hour, dt.strftime("%Y-%m-%d"), dt.strftime("%H:%M")
+
+
+@functools.lru_cache(maxsize=DATE_LABEL_CACHE_SIZE)
+def format_date_label(date_str: str, fmt: str) -> str:
+    """Format a "YYYY-MM-DD" date for emails, e.g. "%a %d %b" -> "Tue 20 Oct"."""
+    return datetime.strptime(date_str, "%Y-%m-%d").strftime(fmt)
+
+
+CACHED_FUNCTIONS = {
+    "beach_tz": get_beach_tz,
+    "forecast_time": parse_forecast_time,
+    "date_label": format_date_label,
+}
+
+
+def clear_caches():
+    for func in CACHED_FUNCTIONS.values():
+        func.cache_clear()
+
+
+def print_cache_stats():
+    print(f"\n  {'Cache':<14}  {'Hits':>8}  {'Misses':>8}  {'Size':>11}")
+    for name, func in CACHED_FUNCTIONS.items():
+        info = func.cache_info()
+        print(f"  {name:<14}  {info.hits:>8}  {info.misses:>8}  {info.currsize:>5}/{info.maxsize:<5}")
+
+
+# =============================================================================
+# SPATIAL INDEX - nearest beaches within a radius
+# =============================================================================
+
+EARTH_RADIUS_KM = 6371.0
+
+# Beaches are bucketed into 1-degree lat/lon cells (~111 km), so any radius
+# up to a cell width only needs the 3x3 block of cells around the origin.
+GRID_CELL_DEGREES = 1.0
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _grid_cell(lat: float, lon: float) -> tuple:
+    return (math.floor(lat / GRID_CELL_DEGREES), math.floor(lon / GRID_CELL_DEGREES))
+
+
+def _build_beach_grid() -> dict:
+    grid = {}
+    for beach_id, beach in BEACHES.items():
+        grid.setdefault(_grid_cell(beach["lat"], beach["lon"]), []).append(beach_id)
+    return grid
+
+
+BEACH_GRID = _build_beach_grid()
+
+
+def nearest_beaches(beach_id: int, k: int = ALTERNATIVE_MAX_BEACHES,
+                    radius_km: float = ALTERNATIVE_RADIUS_KM) -> list:
+    """
+    Return up to k (beach_id, distance_km) pairs nearest to beach_id,
+    excluding itself, within radius_km. Sorted closest first.
+    """
+    origin = BEACHES.get(beach_id)
+    if not origin:
+        return []
+
+    lat, lon = origin["lat"], origin["lon"]
+    # Widen the cell search for radii larger than one cell (longitude cells shrink towards the pole)
+    lat_span = max(1, math.ceil(radius_km / (111.0 * GRID_CELL_DEGREES)))
+    lon_span = max(1, math.ceil(radius_km / (111.0 * GRID_CELL_DEGREES * math.cos(math.radians(lat)))))
+    row, col = _grid_cell(lat, lon)
+
+    matches = []
+    for drow in range(-lat_span, lat_span + 1):
+        for dcol in range(-lon_span, lon_span + 1):
+            for other_id in BEACH_GRID.get((row + drow, col + dcol), []):
+                if other_id == beach_id:
+                    continue
+                other = BEACHES[other_id]
+                distance = haversine_km(lat, lon, other["lat"], other["lon"])
+                if distance <= radius_km:
+                    matches.append((other_id, distance))
+
+    matches.sort(key=lambda m: m[1])
+    return matches[:k]
+
+
+# =============================================================================
+# PROFILING - per-phase timing/memory, sampled stacks, recorded responses
+# =============================================================================
+
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+_phase_stats = None  # PhaseStats while a --profile run is active
+
+
+class PhaseStats:
+    """Wall time, call count and tracemalloc peak per run phase."""
+
+    def __init__(self):
+        self.phases = {}  # name -> {"calls", "seconds", "peak_bytes"}
+        self.overall_peak_bytes = 0  # kept across the per-phase tracemalloc peak resets
+
+    def track(self, name: str):
+        stats = self.phases.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_bytes": 0})
+        return _PhaseTimer(self, stats)
+
+    def report(self):
+        print(f"\n  {'Phase':<12}  {'Calls':>6}  {'Seconds':>9}  {'Peak KiB':>9}")
+        for name, stats in self.phases.items():
+            print(f"  {name:<12}  {stats['calls']:>6}  {stats['seconds']:>9.3f}  {stats['peak_bytes'] / 1024:>9.1f}")
+
+
+class _PhaseTimer:
+    def __init__(self, owner: PhaseStats, stats: dict):
+        self.owner = owner
+        self.stats = stats
+
+    def __enter__(self):
+        self.start_bytes, peak = tracemalloc.get_traced_memory()
+        self.owner.overall_peak_bytes = max(self.owner.overall_peak_bytes, peak)
+        tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.stats["calls"] += 1
+        self.stats["seconds"] += time.perf_counter() - self.start
+        peak = tracemalloc.get_traced_memory()[1]
+        self.owner.overall_peak_bytes = max(self.owner.overall_peak_bytes, peak)
+        self.stats["peak_bytes"] = max(self.stats["peak_bytes"], peak - self.start_bytes)
+
+
+def profile_phase(name: str):
+    """Attribute a function's time and peak memory to a phase when profiling is on."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _phase_stats is None:
+                return func(*args, **kwargs)
+            with _phase_stats.track(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's stack at a fixed interval into flamegraph collapsed-stack counts."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                # Function identity only (not the current line), so each function is one flamegraph box
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ResponseRecorder(HTTPAdapter):
+    """
+    Transport adapter for http_session that records responses to a directory,
+    or replays them from it so a run needs no network or API keys.
+    When replaying, POST/PATCH (emails, Supabase writes) succeed without being sent.
+    Recordings include Supabase user rows (names, emails), so treat the directory as PII.
+    """
+
+    def __init__(self, directory: str, record: bool):
+        super().__init__()
+        self.directory = directory
+        self.record = record
+        self.replaying = not record
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _redacted_path(url: str) -> str:
+        path = urlparse(url).path
+        if WILLYWEATHER_API_KEY:
+            path = path.replace(WILLYWEATHER_API_KEY, "{key}")
+        return path
+
+    def _recording_path(self, request) -> str:
+        # Keyed on the URL path with the API key redacted, and startDate dropped,
+        # so recordings replay offline on later days without credentials
+        params = {k: v for k, v in parse_qs(urlparse(request.url).query).items() if k != "startDate"}
+        key = json.dumps([request.method, self._redacted_path(request.url), params], sort_keys=True)
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    @staticmethod
+    def _recorded_response(request, status_code: int, text: str):
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = "Recorded"
+        response._content = text.encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def send(self, request, **kwargs):
+        path = self._recording_path(request)
+        if self.record:
+            response = super().send(request, **kwargs)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "method": request.method,
+                    "url": self._redacted_path(request.url),
+                    "status_code": response.status_code,
+                    "text": response.text,
+                }, f)
+            return response
+
+        if request.method != "GET":
+            return self._recorded_response(request, 200, "{}")
+        if not os.path.exists(path):
+            raise requests.ConnectionError(
+                f"No recorded response for GET {self._redacted_path(request.url)}", request=request)
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        return self._recorded_response(request, saved["status_code"], saved["text"])
+
+
+def run_profiled(target, output_prefix: str, responses_dir: str = None, record: bool = False):
+    """
+    Run target() under cProfile, a stack sampler and tracemalloc.
+    Writes <output_prefix>.pstats and <output_prefix>.collapsed and prints
+    per-phase time and peak memory.
+    """
+    global _phase_stats
+
+    if responses_dir:
+        recorder = ResponseRecorder(responses_dir, record)
+        http_session.mount("https://", recorder)
+        http_session.mount("http://", recorder)
+        print(f"{'Recording' if record else 'Replaying'} HTTP responses in {responses_dir}")
+
+    _phase_stats = PhaseStats()
+    sampler = StackSampler(threading.get_ident())
+    profiler = cProfile.Profile()
+
+    tracemalloc.start()
+    sampler.start()
+    profiler.enable()
+    try:
+        target()
+    finally:
+        profiler.disable()
+        sampler.stop()
+        overall_peak = max(_phase_stats.overall_peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        if responses_dir:
+            http_session.mount("https://", HTTPAdapter())
+            http_session.mount("http://", HTTPAdapter())
+
+    print("\n" + "=" * 50)
+    print("PROFILE")
+    print("=" * 50)
+    _phase_stats.report()
+    print_cache_stats()
+    print(f"\n  Overall peak memory: {overall_peak / 1024:.1f} KiB")
+    _phase_stats = None
+
+    profiler.dump_stats(f"{output_prefix}.pstats")
+    sampler.write_collapsed(f"{output_prefix}.collapsed")
+    print(f"  Wrote {output_prefix}.pstats and {output_prefix}.collapsed ({sum(sampler.stacks.values())} samples)\n")
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+
+def _parse_profile_args(args: list) -> tuple:
+    """
+    Split "--profile [--out PREFIX] [--record DIR | --recorded DIR] <command...>"
+    into (run_profiled options, remaining command args).
+    """
+    options = {"output_prefix": f"swellcheck-profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}"}
+    while len(args) >= 2 and args[0] in ("--out", "--record", "--recorded"):
+        flag, value, args = args[0], args[1], args[2:]
+        if flag == "--out":
+            options["output_prefix"] = value
+        else:
+            options["responses_dir"] = value
+            options["record"] = flag == "--record"
+    return options, args
+
+
 # =============================================================================
 # SUPABASE
 # =============================================================================
@@ -203,6 +625,7 @@ def _supabase_headers():
     }
 
 
+@profile_phase("load_users")
 def get_active_users() -> list:
     """Fetch all active users from Supabase."""
     if not SUPABASE_KEY:
@@ -213,7 +636,7 @@ def get_active_users() -> list:
     params = {"is_active": "eq.true", "select": "*"}
 
     try:
-        response = requests.get(url, headers=_supabase_headers(), params=params)
+        response = http_session.get(url, headers=_supabase_headers(), params=params)
         response.raise_for_status()
         users = response.json()
         print(f"  Fetched {len(users)} active user(s) from Supabase")
@@ -223,24 +646,42 @@ def get_active_users() -> list:
         return []
 
 
-def get_alerted_dates(user_id: str) -> list:
-    """Get the list of dates already alerted for this user."""
+def get_user(user_id: str) -> dict:
+    """
+    Fetch a single active user by id from Supabase, or None if there is no
+    such user. Request failures are raised, not reported as a missing user.
+    """
+    url = f"{SUPABASE_URL}/rest/v1/users"
+    params = {"id": f"eq.{user_id}", "is_active": "eq.true", "select": "*"}
+
+    response = http_session.get(url, headers=_supabase_headers(), params=params)
+    response.raise_for_status()
+    rows = response.json()
+    return rows[0] if rows else None
+
+
+def get_alerted_dates(user_id: str, column: str = "alerted_dates") -> list:
+    """
+    Get the list of dates already alerted for this user. column is
+    "alerted_dates" for the home beach or "suggested_dates" for
+    nearby-break suggestions ("YYYY-MM-DD@beach_id").
+    """
     url = f"{SUPABASE_URL}/rest/v1/users"
-    params = {"id": f"eq.{user_id}", "select": "alerted_dates"}
+    params = {"id": f"eq.{user_id}", "select": column}
 
     try:
-        response = requests.get(url, headers=_supabase_headers(), params=params)
+        response = http_session.get(url, headers=_supabase_headers(), params=params)
         response.raise_for_status()
         rows = response.json()
-        if rows and rows[0].get("alerted_dates"):
-            return rows[0]["alerted_dates"]
+        if rows and rows[0].get(column):
+            return rows[0][column]
     except Exception as e:
-        print(f"    Warning: Could not fetch alerted_dates: {e}")
+        print(f"    Warning: Could not fetch {column}: {e}")
     return []
 
 
-def save_alerted_dates(user_id: str, dates: list):
-    """Save the updated list of alerted dates for a user."""
+def save_alerted_dates(user_id: str, dates: list, column: str = "alerted_dates"):
+    """Save the updated list of alerted dates (or suggestions, see get_alerted_dates) for a user."""
     url = f"{SUPABASE_URL}/rest/v1/users"
     headers = {**_supabase_headers(), "Prefer": "return=minimal"}
     params = {"id": f"eq.{user_id}"}
@@ -250,34 +691,250 @@ def save_alerted_dates(user_id: str, dates: list):
     clean_dates = [d for d in dates if d >= cutoff]
 
     try:
-        requests.patch(url, headers=headers, params=params, json={
-            "alerted_dates": clean_dates,
+        response = http_session.patch(url, headers=headers, params=params, json={
+            column: clean_dates,
             "last_alert_at": datetime.now(tz=ZoneInfo("UTC")).isoformat(),
         })
+        response.raise_for_status()
     except Exception as e:
-        print(f"    Warning: Could not save alerted_dates: {e}")
+        print(f"    Warning: Could not save {column}: {e}")
 
 
 # =============================================================================
 # WILLYWEATHER API
 # =============================================================================
 
-def get_forecast(location_id: int, days: int = 5) -> dict:
+def _replaying_recorded() -> bool:
+    """True while --profile --recorded serves HTTP from disk instead of the network."""
+    return getattr(http_session.get_adapter(BASE_URL), "replaying", False)
+
+
+def quota_cost(forecasts: str, forecast_graphs: str) -> int:
+    """Quota units for one request: WillyWeather bills each forecast type and graph separately."""
+    return len([f for f in forecasts.split(",") if f]) + len([g for g in forecast_graphs.split(",") if g])
+
+
+def _quota_day() -> str:
+    return datetime.now(tz=ZoneInfo(QUOTA_TIMEZONE)).strftime("%Y-%m-%d")
+
+
+def get_quota_used(day: str) -> int:
+    """Units used on day, from the willyweather_quota table shared by every process."""
+    url = f"{SUPABASE_URL}/rest/v1/willyweather_quota"
+    params = {"day": f"eq.{day}", "select": "units"}
+
+    response = http_session.get(url, headers=_supabase_headers(), params=params)
+    response.raise_for_status()
+    rows = response.json()
+    return rows[0]["units"] if rows else 0
+
+
+def record_quota_usage(units: int):
+    """
+    Add units to today's usage. The increment runs inside Postgres
+    (record_willyweather_usage), so the worker and --serve can't lose updates.
+    """
+    url = f"{SUPABASE_URL}/rest/v1/rpc/record_willyweather_usage"
+
+    try:
+        response = http_session.post(url, headers=_supabase_headers(),
+                                     json={"p_day": _quota_day(), "p_units": units})
+        response.raise_for_status()
+    except Exception as e:
+        print(f"  Warning: Could not record quota usage: {e}")
+
+
+def remaining_quota() -> float:
+    """
+    Units left today, or infinity when WILLYWEATHER_DAILY_QUOTA is unset.
+    If usage can't be read, nothing is left, so the quota is never overrun.
+    """
+    if not WILLYWEATHER_DAILY_QUOTA or _replaying_recorded():
+        return float("inf")
+    try:
+        used = get_quota_used(_quota_day())
+    except Exception as e:
+        print(f"  Warning: Could not read quota usage, treating quota as spent: {e}")
+        return 0
+    return max(0, WILLYWEATHER_DAILY_QUOTA - used)
+
+
+@profile_phase("fetch")
+def get_forecast(location_id: int, days: int = 5, forecasts: str = "swell,tides,wind",
+                 forecast_graphs: str = "tides") -> dict:
     """Get swell, tide graph, and wind forecast for a location."""
     url = f"{BASE_URL}/{WILLYWEATHER_API_KEY}/locations/{location_id}/weather.json"
 
     params = {
-        "forecasts": "swell,tides,wind",
-        "forecastGraphs": "tides",
+        "forecasts": forecasts,
+        "forecastGraphs": forecast_graphs,
         "days": days,
         "startDate": datetime.now(tz=ZoneInfo("UTC")).strftime("%Y-%m-%d"),
     }
 
-    response = requests.get(url, params=params)
+    response = http_session.get(url, params=params)
     response.raise_for_status()
+    if not _replaying_recorded():
+        record_quota_usage(quota_cost(forecasts, forecast_graphs))
     return response.json()
 
 
+def plan_fetches(users: list, budget: float = None) -> list:
+    """
+    Plan one request per subscribed beach, most subscribers first, leaving
+    out beaches that don't fit in budget (default: remaining_quota()).
+    Every beach gets the same trimmed request: FORECAST_DAYS of
+    FETCH_FORECASTS plus FETCH_FORECAST_GRAPHS.
+
+    Returns [{ "beach_id", "subscribers", "days", "forecasts", "forecast_graphs", "cost" }, ...]
+    """
+    if budget is None:
+        budget = remaining_quota()
+
+    subscribers = Counter(u["beach_id"] for u in users if u.get("beach_id"))
+
+    plans = [
+        {
+            "beach_id": beach_id,
+            "subscribers": count,
+            "days": FORECAST_DAYS,
+            "forecasts": FETCH_FORECASTS,
+            "forecast_graphs": FETCH_FORECAST_GRAPHS,
+            "cost": quota_cost(FETCH_FORECASTS, FETCH_FORECAST_GRAPHS),
+        }
+        for beach_id, count in subscribers.items()
+    ]
+    return fit_to_budget(plans, budget)
+
+
+def fit_to_budget(plans: list, budget: float) -> list:
+    """Keep the plans that fit in budget, most subscribers first."""
+    planned = []
+    for plan in sorted(plans, key=lambda p: (-p["subscribers"], p["beach_id"])):
+        if plan["cost"] > budget:
+            print(f"  Quota: skipping beach {plan['beach_id']} ({plan['subscribers']} subscriber(s)), "
+                  f"{budget:.0f} unit(s) left")
+            continue
+        budget -= plan["cost"]
+        planned.append(plan)
+    return planned
+
+
+def fetch_planned_forecast(plan: dict, spare: float) -> tuple:
+    """
+    Fetch one beach's forecast with its planned parameters. spare is the
+    quota left over after the whole plan; the tide-events fallback only
+    spends from that, never from units planned for other beaches.
+    Returns (forecast, spare left).
+    """
+    beach_id = plan["beach_id"]
+    forecast = get_forecast(beach_id, days=plan["days"], forecasts=plan["forecasts"],
+                            forecast_graphs=plan["forecast_graphs"])
+    # Fall back to plain tide events when the tide graph is missing
+    fallback_cost = quota_cost("tides", "")
+    if not build_tide_timeline(forecast) and spare >= fallback_cost:
+        tides = get_forecast(beach_id, days=plan["days"], forecasts="tides", forecast_graphs="")
+        forecast.setdefault("forecasts", {})["tides"] = tides.get("forecasts", {}).get("tides", {})
+        spare -= fallback_cost
+    return forecast, spare
+
+
+def fetch_forecasts(plans: list, spare: float = None) -> dict:
+    """
+    Fetch each planned beach's forecast once. spare (default: the remaining
+    quota minus the plan's cost) bounds the tide-events fallbacks.
+    Returns { beach_id: forecast }; beaches that fail to fetch are left out.
+    """
+    # Recorded responses (--profile --recorded) need no rate limit
+    replaying = _replaying_recorded()
+    if spare is None:
+        spare = remaining_quota() - sum(p["cost"] for p in plans)
+
+    forecasts = {}
+    for i, plan in enumerate(plans):
+        beach_id = plan["beach_id"]
+        if i and not replaying:
+            time.sleep(1)  # rate limit WillyWeather
+        try:
+            forecasts[beach_id], spare = fetch_planned_forecast(plan, spare)
+        except Exception as e:
+            print(f"  Error fetching forecast for beach {beach_id}: {e}")
+    return forecasts
+
+
+# =============================================================================
+# FORECAST ARCHIVE
+# =============================================================================
+
+# Columns kept per forecast type; everything else in the API response is dropped
+ARCHIVE_COLUMNS = {
+    "swell": ("dateTime", "height", "period", "directionText"),
+    "wind": ("dateTime", "speed", "directionText"),
+    "tides": ("dateTime", "height", "type"),
+}
+
+
+def _archive_path(beach_id: int, date_str: str) -> str:
+    return os.path.join(FORECAST_ARCHIVE_DIR, str(beach_id), f"{date_str}.json.gz")
+
+
+def archive_forecast(beach_id: int, forecast: dict, date_str: str = None):
+    """
+    Store the parts of a forecast that evaluate_forecast reads, one list per
+    column, under the beach/date partition for the day it was fetched.
+    """
+    date_str = date_str or datetime.now(tz=get_beach_tz(beach_id)).strftime("%Y-%m-%d")
+    forecasts = forecast.get("forecasts", {})
+
+    table = {}
+    for kind, columns in ARCHIVE_COLUMNS.items():
+        entries = [e for day in forecasts.get(kind, {}).get("days", []) for e in day.get("entries", [])]
+        table[kind] = {col: [e.get(col) for e in entries] for col in columns}
+
+    points = [
+        p
+        for day in forecast.get("forecastGraphs", {}).get("tides", {})
+                           .get("dataConfig", {}).get("series", {}).get("groups", [])
+        for p in day.get("points", [])
+    ]
+    table["tideGraph"] = {"x": [p.get("x") for p in points], "y": [p.get("y") for p in points]}
+
+    path = _archive_path(beach_id, date_str)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(table, f, separators=(",", ":"))
+
+
+def load_archived_forecast(path: str) -> dict:
+    """Rebuild a forecast dict (in API response shape) from an archived partition."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        table = json.load(f)
+
+    forecasts = {}
+    for kind, columns in ARCHIVE_COLUMNS.items():
+        cols = table.get(kind, {})
+        entries = [dict(zip(columns, row)) for row in zip(*(cols.get(c, []) for c in columns))]
+        forecasts[kind] = {"days": [{"entries": entries}]}
+
+    graph = table.get("tideGraph", {})
+    points = [{"x": x, "y": y} for x, y in zip(graph.get("x", []), graph.get("y", []))]
+    forecast = {"forecasts": forecasts}
+    if points:
+        forecast["forecastGraphs"] = {"tides": {"dataConfig": {"series": {"groups": [{"points": points}]}}}}
+    return forecast
+
+
+def list_archive(beach_id: int, start: str = None, end: str = None) -> list:
+    """Return [(date_str, path), ...] for a beach's archived forecasts, oldest first."""
+    partitions = []
+    for path in glob.glob(os.path.join(FORECAST_ARCHIVE_DIR, str(beach_id), "*.json.gz")):
+        date_str = os.path.basename(path)[:-len(".json.gz")]
+        if (start and date_str < start) or (end and date_str > end):
+            continue
+        partitions.append((date_str, path))
+    return sorted(partitions)
+
+
 # =============================================================================
 # WIND DIRECTION LOGIC
 # =============================================================================
@@ -309,7 +966,8 @@ def classify_wind_direction(degrees: float, beach_id: int) -> str:
     return "onshore"
 
 
-def is_good_wind_for_user(wind: dict, user: dict, beach_id: int) -> tuple:
+def is_good_wind_for_user(wind: dict, user: dict, beach_id: int,
+                          wind_tolerance: float = WIND_TOLERANCE) -> tuple:
     speed = wind.get("speed", 999)
     direction = wind.get("direction", "")
 
@@ -329,13 +987,13 @@ def is_good_wind_for_user(wind: dict, user: dict, beach_id: int) -> tuple:
         max_speed = user.get("onshore_max_wind", 5)
         type_label = "Onshore"
 
-    # Allow 20% tolerance to account for forecast inaccuracy
-    tolerance_max = max_speed * 1.2
+    # Allow some tolerance to account for forecast inaccuracy
+    tolerance_max = max_speed * (1 + wind_tolerance)
 
     if speed <= max_speed:
         return True, wind_type, f"{type_label}: {speed} km/h {direction}"
     elif speed <= tolerance_max:
-        return True, wind_type, f"{type_label}: {speed} km/h {direction} (within 20% tolerance of {max_speed})"
+        return True, wind_type, f"{type_label}: {speed} km/h {direction} (within {wind_tolerance:.0%} tolerance of {max_speed})"
     else:
         return False, wind_type, f"{type_label}: {speed} km/h {direction} exceeds max {max_speed}"
 
@@ -376,14 +1034,13 @@ def build_tide_timeline(forecast: dict) -> list:
     return tide_points
 
 
-def get_tide_at_time(tide_points: list, target_dt: datetime, tz: ZoneInfo) -> float:
-    """Interpolate tide height at a given time from tide data points."""
+def get_tide_at_time(tide_points: list, target_ts: float, tz: ZoneInfo) -> float:
+    """Interpolate tide height at a given epoch time from tide data points."""
     if not tide_points:
         return None
 
     # If we have graph data with x timestamps
     if tide_points[0].get("x") is not None:
-        target_ts = target_dt.timestamp()
         best = None
         best_diff = float("inf")
         for p in tide_points:
@@ -397,19 +1054,21 @@ def get_tide_at_time(tide_points: list, target_dt: datetime, tz: ZoneInfo) -> fl
     best = None
     best_diff = float("inf")
     for p in tide_points:
-        try:
-            pdt = datetime.strptime(p["dt_str"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=tz)
-            diff = abs((pdt - target_dt).total_seconds())
-            if diff < best_diff:
-                best_diff = diff
-                best = p["height"]
-        except (ValueError, TypeError):
+        parsed = parse_forecast_time(p["dt_str"], tz)
+        if parsed is None:
             continue
+        diff = abs(parsed[0] - target_ts)
+        if diff < best_diff:
+            best_diff = diff
+            best = p["height"]
 
     return best
 
 
-def evaluate_forecast(forecast: dict, user: dict, beach_id: int) -> list:
+@profile_phase("evaluate")
+def evaluate_forecast(forecast: dict, user: dict, beach_id: int,
+                      min_period: float = MIN_SWELL_PERIOD,
+                      wind_tolerance: float = WIND_TOLERANCE) -> list:
     """
     Evaluate 5-day forecast and return list of good dates with details.
     Each entry: { "date": "YYYY-MM-DD", "windows": [...] }
@@ -449,26 +1108,26 @@ def evaluate_forecast(forecast: dict, user: dict, beach_id: int) -> list:
         dt_str = entry.get("dateTime")
         swell_height = entry.get("height", 0)
 
-        try:
-            dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=tz)
-        except (ValueError, TypeError):
+        parsed = parse_forecast_time(dt_str, tz)
+        if parsed is None:
             continue
+        ts, hour, date_str, time_str = parsed
 
         # Check user's preferred hours
-        if dt.hour < start_hour or dt.hour >= end_hour:
+        if hour < start_hour or hour >= end_hour:
             continue
 
         # Check swell range
         if not (min_swell <= swell_height <= max_swell):
             continue
 
-        # Check swell period (must be 7s or more for quality waves)
+        # Check swell period (must be min_period or more for quality waves)
         swell_period = entry.get("period", 0)
-        if swell_period < 7:
+        if swell_period < min_period:
             continue
 
         # Get tide height at this time
-        tide_height = get_tide_at_time(tide_points, dt, tz)
+        tide_height = get_tide_at_time(tide_points, ts, tz)
         if tide_height is None:
             continue
 
@@ -482,28 +1141,26 @@ def evaluate_forecast(forecast: dict, user: dict, beach_id: int) -> list:
             nearest_wind = None
             min_diff = float("inf")
             for wdt_str, wdata in wind_by_time.items():
-                try:
-                    wdt = datetime.strptime(wdt_str, "%Y-%m-%d %H:%M:%S").replace(tzinfo=tz)
-                    diff = abs((wdt - dt).total_seconds())
-                    if diff < min_diff:
-                        min_diff = diff
-                        nearest_wind = wdata
-                except (ValueError, TypeError):
+                wparsed = parse_forecast_time(wdt_str, tz)
+                if wparsed is None:
                     continue
+                diff = abs(wparsed[0] - ts)
+                if diff < min_diff:
+                    min_diff = diff
+                    nearest_wind = wdata
             wind = nearest_wind or {"speed": 999, "direction": "N/A"}
 
         # Check wind
-        is_good, wind_type, wind_reason = is_good_wind_for_user(wind, user, beach_id)
+        is_good, wind_type, wind_reason = is_good_wind_for_user(wind, user, beach_id, wind_tolerance)
         if not is_good:
             continue
 
         # This time window is good!
-        date_str = dt.strftime("%Y-%m-%d")
         if date_str not in good_days:
             good_days[date_str] = []
 
         good_days[date_str].append({
-            "time": dt.strftime("%H:%M"),
+            "time": time_str,
             "swell": swell_height,
             "swell_period": entry.get("period", 0),
             "swell_dir": entry.get("directionText", ""),
@@ -516,13 +1173,33 @@ def evaluate_forecast(forecast: dict, user: dict, beach_id: int) -> list:
     return good_days
 
 
+def find_alternative_days(forecasts: dict, user: dict, beach_id: int,
+                          min_period: float = MIN_SWELL_PERIOD,
+                          wind_tolerance: float = WIND_TOLERANCE) -> list:
+    """
+    Evaluate the user's thresholds at nearby beaches whose forecasts were
+    already fetched this run. No extra API calls are made.
+    Returns [(alt_beach_id, distance_km, good_days), ...] closest first.
+    """
+    alternatives = []
+    for alt_id, distance in nearest_beaches(beach_id):
+        forecast = forecasts.get(alt_id)
+        if not forecast:
+            continue
+        good_days = evaluate_forecast(forecast, user, alt_id, min_period, wind_tolerance)
+        if good_days:
+            alternatives.append((alt_id, distance, good_days))
+    return alternatives
+
+
 # =============================================================================
 # EMAIL
 # =============================================================================
 
+@profile_phase("email")
 def send_email(to_email: str, subject: str, body: str) -> bool:
     try:
-        response = requests.post(
+        response = http_session.post(
             "https://api.resend.com/emails",
             headers={
                 "Authorization": f"Bearer {RESEND_API_KEY}",
@@ -547,16 +1224,60 @@ def send_email(to_email: str, subject: str, body: str) -> bool:
         return False
 
 
+def _format_day_block(date_str: str, windows: list) -> str:
+    """Format one good day's best window for an alert email."""
+    body = f"{'=' * 44}\n"
+    body += f"📅 {format_date_label(date_str, '%A %d %B %Y')}\n"
+    body += f"{'=' * 44}\n\n"
+
+    # Show the best window (lowest wind, best swell)
+    best = min(windows, key=lambda w: w["wind_speed"])
+
+    # Show time range
+    times = sorted(set(w["time"] for w in windows))
+    if len(times) == 1:
+        body += f"  ⏰ Best around {times[0]}\n"
+    else:
+        body += f"  ⏰ Good windows: {times[0]} – {times[-1]}\n"
+
+    body += f"  🌊 Swell: {best['swell']:.1f}m"
+    if best.get("swell_period"):
+        body += f" @ {best['swell_period']:.0f}s"
+    if best.get("swell_dir"):
+        body += f" ({best['swell_dir']})"
+    body += "\n"
+
+    body += f"  🌊 Tide: {best['tide']:.2f}m\n"
+
+    wind_label = {"offshore": "Offshore ✓", "cross_shore": "Cross-shore ~", "onshore": "Onshore"}
+    body += f"  💨 Wind: {best['wind_speed']} km/h {best['wind_dir']}"
+    body += f" — {wind_label.get(best['wind_type'], best['wind_type'])}\n"
+    body += "\n"
+    return body
+
+
+def _format_email_footer(user: dict) -> str:
+    """Format the thresholds summary and settings link shared by all alert emails."""
+    body = "—\n"
+    body += f"Your thresholds:\n"
+    body += f"  Swell: {user.get('min_swell', 1.0)}m – {user.get('max_swell', 3.0)}m\n"
+    body += f"  Tide: {user.get('min_tide', 0):.1f}m – {user.get('max_tide', 2.0):.1f}m\n"
+    body += f"  Offshore wind: up to {user.get('offshore_max_wind', 25)} km/h\n"
+    body += f"  Cross-shore wind: up to {user.get('cross_shore_max_wind', 10)} km/h\n"
+    body += f"  Onshore wind: up to {user.get('onshore_max_wind', 5)} km/h\n"
+    body += f"  Hours: {user.get('start_hour', 5)}:00 – {user.get('end_hour', 18)}:00\n"
+    body += "\n"
+    body += "Update your settings: https://www.swellcheck.co/account\n\n"
+    body += "This is an automated message. Please do not reply to this email.\n"
+    return body
+
+
 def format_forecast_email(user: dict, beach_name: str, good_days: dict, new_dates: list) -> tuple:
     """Format the 5-day forecast alert email."""
-    tz = get_beach_tz(user.get("beach_id", 0))
     name = user.get("name", "Surfer")
 
     # Build subject with the dates
-    date_labels = []
-    for date_str in sorted(new_dates):
-        dt = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=tz)
-        date_labels.append(dt.strftime("%a %d %b"))
+    date_labels = [format_date_label(date_str, "%a %d %b") for date_str in sorted(new_dates)]
 
     if len(date_labels) == 1:
         subject = f"🏄 Surf window ahead! {beach_name} looks good on {date_labels[0]}"
@@ -567,48 +1288,39 @@ def format_forecast_email(user: dict, beach_name: str, good_days: dict, new_date
     body += f"We've spotted good conditions coming up at {beach_name}.\n\n"
 
     for date_str in sorted(new_dates):
-        dt = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=tz)
-        body += f"{'=' * 44}\n"
-        body += f"📅 {dt.strftime('%A %d %B %Y')}\n"
-        body += f"{'=' * 44}\n\n"
+        body += _format_day_block(date_str, good_days[date_str])
 
-        windows = good_days[date_str]
+    body += _format_email_footer(user)
 
-        # Show the best window (lowest wind, best swell)
-        best = min(windows, key=lambda w: w["wind_speed"])
+    return subject, body
 
-        # Show time range
-        times = sorted(set(w["time"] for w in windows))
-        if len(times) == 1:
-            body += f"  ⏰ Best around {times[0]}\n"
-        else:
-            body += f"  ⏰ Good windows: {times[0]} – {times[-1]}\n"
 
-        body += f"  🌊 Swell: {best['swell']:.1f}m"
-        if best.get("swell_period"):
-            body += f" @ {best['swell_period']:.0f}s"
-        if best.get("swell_dir"):
-            body += f" ({best['swell_dir']})"
-        body += "\n"
+def format_alternative_email(user: dict, beach_name: str, alternatives: list, new_keys: set) -> tuple:
+    """
+    Format the nearby-break suggestion email, sent when the home beach
+    has no good days. Only dates whose "YYYY-MM-DD@beach_id" key is in
+    new_keys are included.
+    """
+    name = user.get("name", "Surfer")
+    alt_names = [BEACHES[alt_id]["name"] for alt_id, _, good_days in alternatives
+                 if any(f"{d}@{alt_id}" in new_keys for d in good_days)]
 
-        body += f"  🌊 Tide: {best['tide']:.2f}m\n"
+    verb = "looks" if len(alt_names) == 1 else "look"
+    subject = f"🏄 Nothing at {beach_name}, but {', '.join(alt_names)} {verb} good nearby"
 
-        wind_label = {"offshore": "Offshore ✓", "cross_shore": "Cross-shore ~", "onshore": "Onshore"}
-        body += f"  💨 Wind: {best['wind_speed']} km/h {best['wind_dir']}"
-        body += f" — {wind_label.get(best['wind_type'], best['wind_type'])}\n"
-        body += "\n"
+    body = f"Hey {name}!\n\n"
+    body += f"{beach_name} doesn't line up with your thresholds in the next {FORECAST_DAYS} days,\n"
+    body += "but these nearby breaks do:\n\n"
 
-    body += "—\n"
-    body += f"Your thresholds:\n"
-    body += f"  Swell: {user.get('min_swell', 1.0)}m – {user.get('max_swell', 3.0)}m\n"
-    body += f"  Tide: {user.get('min_tide', 0):.1f}m – {user.get('max_tide', 2.0):.1f}m\n"
-    body += f"  Offshore wind: up to {user.get('offshore_max_wind', 25)} km/h\n"
-    body += f"  Cross-shore wind: up to {user.get('cross_shore_max_wind', 10)} km/h\n"
-    body += f"  Onshore wind: up to {user.get('onshore_max_wind', 5)} km/h\n"
-    body += f"  Hours: {user.get('start_hour', 5)}:00 – {user.get('end_hour', 18)}:00\n"
-    body += "\n"
-    body += "Update your settings: https://www.swellcheck.co/account\n\n"
-    body += "This is an automated message. Please do not reply to this email.\n"
+    for alt_id, distance, good_days in alternatives:
+        dates = sorted(d for d in good_days if f"{d}@{alt_id}" in new_keys)
+        if not dates:
+            continue
+        body += f"📍 {BEACHES[alt_id]['name']} ({distance:.0f} km away)\n\n"
+        for date_str in dates:
+            body += _format_day_block(date_str, good_days[date_str])
+
+    body += _format_email_footer(user)
 
     return subject, body
 
@@ -617,10 +1329,47 @@ def format_forecast_email(user: dict, beach_name: str, good_days: dict, new_date
 # MAIN
 # =============================================================================
 
-def check_user_forecast(user: dict) -> bool:
+def alert_alternatives(user: dict, forecasts: dict) -> bool:
+    """
+    Suggest nearby breaks when the user's home beach has no good days.
+    Suggestions are stored as "YYYY-MM-DD@beach_id" in their own
+    suggested_dates column, separate from the home beach's alerted_dates.
+    """
+    user_id = user.get("id")
+    beach_id = user.get("beach_id")
+    beach_name = user.get("beach_name", "Unknown Beach")
+
+    alternatives = find_alternative_days(forecasts, user, beach_id)
+    if not alternatives:
+        return False
+
+    print(f"    Nearby breaks look good: {', '.join(BEACHES[a[0]]['name'] for a in alternatives)}")
+
+    previously_alerted = set(get_alerted_dates(user_id, "suggested_dates"))
+    alt_keys = {f"{d}@{alt_id}" for alt_id, _, good_days in alternatives for d in good_days}
+    new_keys = alt_keys - previously_alerted
+
+    if not new_keys:
+        print(f"    Already suggested these breaks — skipping")
+        return False
+
+    subject, body = format_alternative_email(user, beach_name, alternatives, new_keys)
+
+    if send_email(user.get("email"), subject, body):
+        save_alerted_dates(user_id, list(previously_alerted | alt_keys), "suggested_dates")
+        return True
+
+    return False
+
+
+def check_user_forecast(user: dict, forecasts: dict = None) -> bool:
     """
     Check 5-day forecast for a user. Alert only on NEW good dates
     that haven't been alerted before.
+
+    forecasts is the run's { beach_id: forecast } map from the fetch plan;
+    without one, the home beach is fetched on its own. Nearby-break
+    suggestions only use forecasts already in the map.
     """
     user_id = user.get("id")
     email = user.get("email")
@@ -634,7 +1383,12 @@ def check_user_forecast(user: dict) -> bool:
     print(f"  Checking {name} ({email}) — {beach_name}...")
 
     try:
-        forecast = get_forecast(beach_id, days=FORECAST_DAYS)
+        if forecasts is None:
+            forecasts = {beach_id: get_forecast(beach_id, days=FORECAST_DAYS)}
+        forecast = forecasts.get(beach_id)
+        if not forecast:
+            print(f"    No forecast fetched for this beach this run — skipping")
+            return False
 
         # Get location timezone from API response if available
         location_tz_str = forecast.get("location", {}).get("timeZone")
@@ -646,7 +1400,7 @@ def check_user_forecast(user: dict) -> bool:
 
         if not good_days:
             print(f"    No good days in the next {FORECAST_DAYS} days")
-            return False
+            return alert_alternatives(user, forecasts)
 
         print(f"    Found good conditions on: {', '.join(sorted(good_days.keys()))}")
 
@@ -700,11 +1454,25 @@ def run_once():
         print("  No active users to check")
         return
 
+    # Fetch each subscribed beach once, so users sharing a beach (and
+    # nearby-break suggestions) reuse the same forecast
+    plans = plan_fetches(users)
+    print(f"  Fetching forecasts for {len(plans)} beach(es), "
+          f"{sum(p['cost'] for p in plans)} quota unit(s) planned")
+    forecasts = fetch_forecasts(plans)
+
+    # Archive the forecasts these alerts are based on (recorded replays aren't real forecasts)
+    if not _replaying_recorded():
+        for beach_id, forecast in forecasts.items():
+            try:
+                archive_forecast(beach_id, forecast)
+            except OSError as e:
+                print(f"  Warning: Could not archive forecast for beach {beach_id}: {e}")
+
     alerts_sent = 0
     for user in users:
-        if check_user_forecast(user):
+        if check_user_forecast(user, forecasts):
             alerts_sent += 1
-        time.sleep(1)  # rate limit WillyWeather
 
     print(f"\nDone. Sent {alerts_sent} forecast alert(s) to {len(users)} user(s).")
 
@@ -731,6 +1499,372 @@ def run_loop():
         run_once()
 
 
+# =============================================================================
+# ON-DEMAND EVALUATION SERVICE
+# =============================================================================
+
+_forecast_cache = {}  # beach_id -> (fetched_at, forecast, plan)
+_forecast_cache_lock = threading.Lock()
+_beach_fetch_locks = {}  # beach_id -> Lock, so concurrent misses fetch a beach once
+
+
+def get_cached_forecast(beach_id: int) -> dict:
+    """
+    Return the in-memory forecast for beach_id. Only a beach that has never
+    been cached is fetched inline, and only if the quota allows it;
+    refreshing is left to the background thread.
+    """
+    with _forecast_cache_lock:
+        cached = _forecast_cache.get(beach_id)
+        fetch_lock = _beach_fetch_locks.setdefault(beach_id, threading.Lock())
+    if cached:
+        return cached[1]
+
+    with fetch_lock:
+        # Another request may have fetched it while we waited
+        with _forecast_cache_lock:
+            cached = _forecast_cache.get(beach_id)
+        if cached:
+            return cached[1]
+
+        budget = remaining_quota()
+        plans = plan_fetches([{"beach_id": beach_id}], budget)
+        if not plans:
+            raise RuntimeError(f"WillyWeather quota exhausted, not fetching beach {beach_id}")
+
+        forecast, _ = fetch_planned_forecast(plans[0], budget - plans[0]["cost"])
+        with _forecast_cache_lock:
+            _forecast_cache[beach_id] = (time.time(), forecast, plans[0])
+        return forecast
+
+
+def refresh_stale_forecasts():
+    """
+    Refetch cached forecasts that will pass FORECAST_CACHE_TTL before the
+    next refresh pass, using their planned parameters and only as far as
+    the remaining quota allows. Beaches left out keep their old forecast.
+    """
+    refresh_age = FORECAST_CACHE_TTL - FORECAST_REFRESH_INTERVAL
+    with _forecast_cache_lock:
+        stale = [plan for fetched_at, _, plan in _forecast_cache.values() if time.time() - fetched_at >= refresh_age]
+
+    budget = remaining_quota()
+    refresh = fit_to_budget(stale, budget)
+    spare = budget - sum(p["cost"] for p in refresh)
+    for plan in refresh:
+        try:
+            forecast, spare = fetch_planned_forecast(plan, spare)
+        except Exception as e:
+            # Keep serving the previous forecast; the next pass retries
+            print(f"  Error refreshing forecast for beach {plan['beach_id']}: {e}")
+            continue
+        with _forecast_cache_lock:
+            _forecast_cache[plan["beach_id"]] = (time.time(), forecast, plan)
+
+
+def _refresh_forecasts_forever():
+    while True:
+        time.sleep(FORECAST_REFRESH_INTERVAL)
+        refresh_stale_forecasts()
+
+
+def evaluate_user(user_id: str) -> dict:
+    """
+    Evaluate a single user's thresholds against the hot forecast for their beach.
+    Returns the JSON payload served by /evaluate, or None if the user doesn't exist.
+    """
+    user = get_user(user_id)
+    if not user:
+        return None
+
+    beach_id = user.get("beach_id")
+    good_days = {}
+    if beach_id:
+        good_days = evaluate_forecast(get_cached_forecast(beach_id), user, beach_id)
+
+    return {
+        "user_id": user_id,
+        "beach_id": beach_id,
+        "beach_name": user.get("beach_name"),
+        "good_days": good_days,
+    }
+
+
+class EvaluationHandler(BaseHTTPRequestHandler):
+    """
+    GET /health                     -> {"status": "ok", "cached_beaches": N}
+    GET /evaluate?user_id=<id>      -> {"user_id", "beach_id", "beach_name", "good_days"}
+
+    /evaluate requires "Authorization: Bearer <SERVICE_TOKEN>".
+    """
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+
+        if parsed.path == "/health":
+            with _forecast_cache_lock:
+                cached = len(_forecast_cache)
+            self._send_json(200, {"status": "ok", "cached_beaches": cached})
+            return
+
+        authorization = self.headers.get("Authorization", "")
+        if not hmac.compare_digest(authorization.encode("utf-8"), f"Bearer {SERVICE_TOKEN}".encode("utf-8")):
+            self._send_json(401, {"error": "Unauthorized"})
+            return
+
+        if parsed.path != "/evaluate":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        user_id = parse_qs(parsed.query).get("user_id", [""])[0]
+        if not user_id:
+            self._send_json(400, {"error": "user_id is required"})
+            return
+
+        try:
+            result = evaluate_user(user_id)
+        except Exception as e:
+            print(f"  Error evaluating {user_id}: {e}")
+            self._send_json(502, {"error": "Evaluation unavailable"})
+            return
+
+        if result is None:
+            self._send_json(404, {"error": "User not found"})
+            return
+
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        print(f"  [{self.log_date_time_string()}] {format % args}")
+
+
+def run_service(port: int = SERVICE_PORT):
+    """Serve on-demand evaluations, keeping per-beach forecasts hot in memory."""
+    print(f"SWELLCHECK — EVALUATION SERVICE on {SERVICE_HOST}:{port}")
+
+    if not SERVICE_TOKEN:
+        print("ERROR: SERVICE_TOKEN not set!")
+        return
+
+    if not WILLYWEATHER_API_KEY or WILLYWEATHER_API_KEY == "YOUR_API_KEY_HERE":
+        print("ERROR: WILLYWEATHER_API_KEY not set!")
+        return
+
+    if not SUPABASE_KEY:
+        print("ERROR: SUPABASE_KEY not set!")
+        return
+
+    # Warm the cache with every subscribed beach so first requests are fast
+    plans = plan_fetches(get_active_users())
+    print(f"  Warming forecasts for {len(plans)} beach(es)")
+    fetched_at = time.time()
+    warmed = fetch_forecasts(plans)
+    with _forecast_cache_lock:
+        for plan in plans:
+            if plan["beach_id"] in warmed:
+                _forecast_cache[plan["beach_id"]] = (fetched_at, warmed[plan["beach_id"]], plan)
+
+    threading.Thread(target=_refresh_forecasts_forever, daemon=True).start()
+
+    server = ThreadingHTTPServer((SERVICE_HOST, port), EvaluationHandler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# =============================================================================
+# REPLAY / BACKTEST
+# =============================================================================
+
+def _replay_beach(task: tuple) -> dict:
+    """
+    Replay every user subscribed to one beach over the archive under each
+    threshold setting, the way check_user_forecast alerts: an email for new
+    home-beach dates, or, on days the home beach has nothing, a nearby-break
+    suggestion for new "date@beach_id" keys. Each beach's partitions are
+    loaded once for all of its users.
+    Returns { (min_period, wind_tolerance): alerts_sent }.
+    """
+    beach_id, users, settings, start, end = task
+    home = [(date_str, load_archived_forecast(path)) for date_str, path in list_archive(beach_id, start, end)]
+    nearby = {
+        alt_id: {date_str: load_archived_forecast(path) for date_str, path in list_archive(alt_id, start, end)}
+        for alt_id, _ in nearest_beaches(beach_id)
+    }
+
+    counts = {}
+    for min_period, wind_tolerance in settings:
+        alerts = 0
+        for user in users:
+            alerted, suggested = set(), set()
+            for date_str, forecast in home:
+                good_days = evaluate_forecast(forecast, user, beach_id, min_period, wind_tolerance)
+                if good_days:
+                    if set(good_days) - alerted:
+                        alerts += 1
+                        alerted |= set(good_days)
+                    continue
+
+                run_forecasts = {alt_id: by_date[date_str] for alt_id, by_date in nearby.items() if date_str in by_date}
+                alternatives = find_alternative_days(run_forecasts, user, beach_id, min_period, wind_tolerance)
+                alt_keys = {f"{d}@{alt_id}" for alt_id, _, alt_days in alternatives for d in alt_days}
+                if alt_keys - suggested:
+                    alerts += 1
+                    suggested |= alt_keys
+        counts[(min_period, wind_tolerance)] = alerts
+    return counts
+
+
+def run_replay(periods: list, tolerances: list, start: str = None, end: str = None):
+    """Backtest every active user over the forecast archive for each period/tolerance combination."""
+    print("=" * 50)
+    print("SWELLCHECK — FORECAST REPLAY")
+    print(f"Archive: {FORECAST_ARCHIVE_DIR} ({start or 'start'} → {end or 'end'})")
+    print("=" * 50)
+
+    users = [u for u in get_active_users() if u.get("beach_id")]
+    if not users:
+        print("  No active users to replay")
+        return
+
+    by_beach = {}
+    for user in users:
+        by_beach.setdefault(user["beach_id"], []).append(user)
+
+    settings = [(p, t) for p in periods for t in tolerances]
+    totals = {setting: 0 for setting in settings}
+
+    tasks = [(beach_id, beach_users, settings, start, end) for beach_id, beach_users in by_beach.items()]
+    with ProcessPoolExecutor() as pool:
+        for counts in pool.map(_replay_beach, tasks):
+            for setting, alerts in counts.items():
+                totals[setting] += alerts
+
+    print(f"\n  {'Period':>8}  {'Tolerance':>10}  {'Alerts':>8}")
+    for (min_period, wind_tolerance), alerts in totals.items():
+        current = " (current)" if (min_period, wind_tolerance) == (MIN_SWELL_PERIOD, WIND_TOLERANCE) else ""
+        print(f"  {min_period:>7}s  {wind_tolerance:>10.0%}  {alerts:>8}{current}")
+
+    print(f"\nReplayed {len(users)} user(s) across {len(by_beach)} beach(es).")
+
+
+REPLAY_USAGE = "python smart_surf_alarm.py --replay [--period 6,7,8] [--tolerance 0.1,0.2] [--from YYYY-MM-DD] [--to YYYY-MM-DD]"
+
+
+def _parse_replay_args(args: list) -> dict:
+    """
+    Parse --period 6,7,8 --tolerance 0.1,0.2 --from YYYY-MM-DD --to YYYY-MM-DD.
+    Raises ValueError for unknown flags, missing values or malformed numbers/dates.
+    """
+    if len(args) % 2:
+        raise ValueError(f"{args[-1]} needs a value")
+    options = {}
+    for flag, value in zip(args[::2], args[1::2]):
+        if flag not in ("--period", "--tolerance", "--from", "--to"):
+            raise ValueError(f"unknown option {flag}")
+        options[flag] = value
+
+    for flag in ("--from", "--to"):
+        if flag in options:
+            try:
+                datetime.strptime(options[flag], "%Y-%m-%d")
+            except ValueError:
+                raise ValueError(f"{flag} must be YYYY-MM-DD, got {options[flag]!r}")
+
+    def numbers(flag: str, default: float) -> list:
+        try:
+            return [float(v) for v in options.get(flag, str(default)).split(",")]
+        except ValueError:
+            raise ValueError(f"{flag} must be comma-separated numbers, got {options[flag]!r}")
+
+    return {
+        "periods": numbers("--period", MIN_SWELL_PERIOD),
+        "tolerances": numbers("--tolerance", WIND_TOLERANCE),
+        "start": options.get("--from"),
+        "end": options.get("--to"),
+    }
+
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def _synthetic_forecast(days: int = FORECAST_DAYS) -> dict:
+    """A WillyWeather-shaped forecast: 3-hourly swell, hourly wind, four tide events a day."""
+    start = datetime(2026, 1, 1)
+    compass = list(COMPASS_TO_DEGREES)
+    swell, wind, tides = [], [], []
+    for hour in range(days * 24):
+        dt_str = (start + timedelta(hours=hour)).strftime("%Y-%m-%d %H:%M:%S")
+        wind.append({"dateTime": dt_str, "speed": hour % 30, "directionText": compass[hour % 16]})
+        if hour % 3 == 0:
+            swell.append({"dateTime": dt_str, "height": 0.5 + (hour % 7) * 0.3,
+                          "period": 5 + hour % 6, "directionText": "E"})
+        if hour % 6 == 3:
+            tides.append({"dateTime": dt_str, "height": 0.2 + (hour % 4) * 0.5, "type": "high"})
+    return {"forecasts": {
+        "swell": {"days": [{"entries": swell}]},
+        "wind": {"days": [{"entries": wind}]},
+        "tides": {"days": [{"entries": tides}]},
+    }}
+
+
+@contextmanager
+def _memoization_disabled():
+    """Point the module at the undecorated originals (__wrapped__) of the cached functions."""
+    module = globals()
+    try:
+        for func in CACHED_FUNCTIONS.values():
+            module[func.__name__] = func.__wrapped__
+        yield
+    finally:
+        for func in CACHED_FUNCTIONS.values():
+            module[func.__name__] = func
+
+
+def run_benchmark(users: int = 200, repeat: int = 5):
+    """Time evaluate_forecast per user with memoization removed vs with the caches warm."""
+    print(f"SWELLCHECK — EVALUATION BENCHMARK ({users} users x {repeat} rounds)")
+
+    forecast = _synthetic_forecast()
+    beach_ids = list(BEACHES)
+    population = [
+        {"beach_id": beach_ids[i % len(beach_ids)], "min_swell": 0.5 + (i % 3) * 0.5,
+         "max_tide": 1.0 + (i % 4) * 0.5, "offshore_max_wind": 15 + i % 15}
+        for i in range(users)
+    ]
+
+    def per_user_seconds() -> float:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for user in population:
+                evaluate_forecast(forecast, user, user["beach_id"])
+            best = min(best, time.perf_counter() - start)
+        return best / users
+
+    with _memoization_disabled():
+        uncached = per_user_seconds()
+    clear_caches()
+    cached = per_user_seconds()
+
+    print(f"\n  Uncached (no memoization): {uncached * 1e6:>8.1f} µs/user")
+    print(f"  Cached   (caches warm):    {cached * 1e6:>8.1f} µs/user")
+    print(f"  Speedup: {uncached / cached:.1f}x")
+    print_cache_stats()
+
+
 def test_user(email: str):
     """Test mode — check a specific user's 5-day forecast."""
     print(f"Testing 5-day forecast for: {email}\n")
@@ -757,15 +1891,40 @@ def test_user(email: str):
 
 
 if __name__ == "__main__":
-    import sys
-
     if len(sys.argv) > 1:
-        if sys.argv[1] == "--test" and len(sys.argv) > 2:
+        if sys.argv[1] == "--profile":
+            profile_options, command = _parse_profile_args(sys.argv[2:])
+            if profile_options.get("responses_dir") and not profile_options["record"]:
+                # Recorded runs need no real credentials
+                WILLYWEATHER_API_KEY = WILLYWEATHER_API_KEY if WILLYWEATHER_API_KEY != "YOUR_API_KEY_HERE" else "recorded"
+                SUPABASE_KEY = SUPABASE_KEY or "recorded"
+                SUPABASE_URL = SUPABASE_URL or "https://recorded.supabase.co"
+            if command[:1] == ["--once"]:
+                run_profiled(run_once, **profile_options)
+            elif command[:1] == ["--test"] and len(command) > 1:
+                run_profiled(lambda: test_user(command[1]), **profile_options)
+            else:
+                print("Usage: python smart_surf_alarm.py --profile [--out PREFIX]")
+                print("         [--record DIR | --recorded DIR] (--once | --test <email>)")
+                print("       --record DIR saves Supabase user rows (names, emails): treat DIR as PII")
+        elif sys.argv[1] == "--test" and len(sys.argv) > 2:
             test_user(sys.argv[2])
         elif sys.argv[1] == "--once":
             run_once()
         elif sys.argv[1] == "--loop":
             run_loop()
+        elif sys.argv[1] == "--replay":
+            try:
+                replay_options = _parse_replay_args(sys.argv[2:])
+            except ValueError as e:
+                print(f"ERROR: {e}")
+                print(f"Usage: {REPLAY_USAGE}")
+            else:
+                run_replay(**replay_options)
+        elif sys.argv[1] == "--bench":
+            run_benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 200)
+        elif sys.argv[1] == "--serve":
+            run_service(int(sys.argv[2]) if len(sys.argv) > 2 else SERVICE_PORT)
         elif sys.argv[1] == "--test-email":
             print("Sending test email...")
             send_email(
@@ -777,7 +1936,14 @@ if __name__ == "__main__":
             print("Usage:")
             print("  python smart_surf_alarm.py --once             # Run single check now")
             print("  python smart_surf_alarm.py --loop             # Run daily at 4AM AEST")
+            print("  python smart_surf_alarm.py --serve [port]     # Serve on-demand evaluations")
+            print("  python smart_surf_alarm.py --replay [--period 6,7,8] [--tolerance 0.1,0.2]")
+            print("                             [--from YYYY-MM-DD] [--to YYYY-MM-DD]  # Backtest thresholds")
+            print("  python smart_surf_alarm.py --bench [users]    # Benchmark per-user evaluation")
             print("  python smart_surf_alarm.py --test <email>     # Test specific user")
             print("  python smart_surf_alarm.py --test-email       # Send test email")
+            print("  python smart_surf_alarm.py --profile [--out PREFIX] [--record DIR | --recorded DIR]")
+            print("                             (--once | --test <email>)  # Profile a run")
+            print("                             (--record DIR saves Supabase user rows: treat DIR as PII)")
     else:
         run_once()
@@ -0,0 +1,3 @@
+-- Nearby-break suggestions already emailed, as "YYYY-MM-DD@beach_id".
+-- Kept apart from alerted_dates so home-beach alerts are never affected.
+alter table users add column if not exists suggested_dates text[] not null default '{}';
@@ -0,0 +1,18 @@
+-- WillyWeather quota units used per day (Australia/Sydney), shared by the
+-- daily worker and the --serve evaluation service.
+create table if not exists willyweather_quota (
+  day date primary key,
+  units integer not null default 0
+);
+
+-- Atomically add p_units to p_day's usage and return the new total.
+-- Rows older than 30 days are pruned.
+create or replace function record_willyweather_usage(p_day date, p_units integer)
+returns integer
+language sql
+as $$
+  delete from willyweather_quota where day < p_day - 30;
+  insert into willyweather_quota (day, units) values (p_day, p_units)
+  on conflict (day) do update set units = willyweather_quota.units + excluded.units
+  returning units;
+$$;